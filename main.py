@@ -1,11 +1,14 @@
+import asyncio
 import logging
 import os
 import re
-from typing import Optional, Union, Tuple
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Union, Tuple
 from dotenv import load_dotenv
 from datetime import datetime
-from telegram import Update, Message, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
+from telegram import Update, Message, Animation, Audio, Document, Video, Voice, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from telegram.request import HTTPXRequest
+from telegram.ext import Application, BaseUpdateProcessor, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
 
 # Load environment variables
 load_dotenv()
@@ -13,6 +16,14 @@ load_dotenv()
 # Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID")
+# Text-only forwards to the admin chat are coalesced for this many seconds (0 disables batching)
+BATCH_FLUSH_INTERVAL = float(os.getenv("BATCH_FLUSH_INTERVAL", "0"))
+# A batch is flushed early once it holds this many characters
+MAX_BUFFER_CHARS = int(os.getenv("MAX_BUFFER_CHARS", "3800"))
+# Receive updates through a webhook instead of long polling
+USE_WEBHOOK = os.getenv("USE_WEBHOOK", "").lower() in ("1", "true", "yes")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+PORT = int(os.getenv("PORT", "8443"))
 WELCOME_MESSAGE = (
     "Welcome to support bot! Please send your complete request in a single message, "
     "and we'll forward it to our team. This helps us process your request efficiently."
@@ -28,6 +39,12 @@ if not TELEGRAM_BOT_TOKEN:
     raise ValueError("TELEGRAM_BOT_TOKEN must be set in .env file")
 if not ADMIN_CHAT_ID:
     raise ValueError("ADMIN_CHAT_ID must be set in .env file")
+try:
+    _ADMIN_CHAT_ID_INT = int(ADMIN_CHAT_ID)
+except ValueError:
+    raise ValueError("ADMIN_CHAT_ID must be a numeric chat ID")
+if USE_WEBHOOK and not WEBHOOK_URL:
+    raise ValueError("WEBHOOK_URL must be set in .env file when USE_WEBHOOK is enabled")
 
 # Setup logging
 logging.basicConfig(
@@ -36,6 +53,162 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns for the tags embedded in forwarded messages
+_TAG_MARKER = "#"
+_IDS_RE = re.compile(
+    r"(?:#ID(?P<id>\d+))"
+    r"|(?:Message sent to user #ID(?P<cid>\d+))"
+    r"|(?:#MSG(?P<msg>\d+))"
+    r"|(?:message #(?P<cmsg>\d+))"
+)
+_ADMSG_MARKER = "#admsg"
+# Longest tail of a message that can hold the #admsg tag
+ADMSG_TAIL_LENGTH = 32
+
+# The Start/Restart keyboard never changes, so it is built once and shared
+_START_KEYBOARD = ReplyKeyboardMarkup(
+    [[KeyboardButton("🔄 Start/Restart")]],
+    resize_keyboard=True
+)
+
+# Supported attachments by kind: (Bot method, file ID getter); the kind doubles as the file argument
+_MEDIA_DISPATCH = {
+    "photo": ("send_photo", lambda m: m.photo[-1].file_id),
+    "video": ("send_video", lambda m: m.video.file_id),
+    "document": ("send_document", lambda m: m.document.file_id),
+    "voice": ("send_voice", lambda m: m.voice.file_id),
+    "audio": ("send_audio", lambda m: m.audio.file_id),
+}
+
+# Attachment classes as returned by Message.effective_attachment; photos come as a tuple of sizes.
+# Telegram also sets message.document for animations, so they are sent as documents.
+_ATTACHMENT_KINDS = (
+    (Video, "video"),
+    (Animation, "document"),
+    (Document, "document"),
+    (Voice, "voice"),
+    (Audio, "audio"),
+)
+
+# How each kind of attachment is described in messages forwarded to the admin
+_ATTACHMENT_LABELS = {
+    "photo": lambda m: "[Photo]",
+    "video": lambda m: "[Video]",
+    "document": lambda m: f"[File: {m.document.file_name}]",
+    "voice": lambda m: "[Voice message]",
+    "audio": lambda m: f"[Audio: {m.audio.title or 'Unknown title'}]",
+}
+
+# Telegram rejects text messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+BATCH_SEPARATOR = "\n---\n"
+# Telegram allows 1024 characters in a caption, counted in UTF-16 code units
+MAX_CAPTION_LENGTH = 1024
+
+# Text forwards waiting to be batched per user and the tasks that flush them
+# after BATCH_FLUSH_INTERVAL
+_admin_batches: Dict[int, List[str]] = {}
+_admin_batch_timers: Dict[int, asyncio.Task] = {}
+
+# Sends to the admin chat run in the background as one chain of tasks per user,
+# so they keep their order without handlers waiting for the admin chat's rate limit
+_admin_forward_chains: Dict[int, asyncio.Task] = {}
+
+# Updates of different chats are processed concurrently, those of one chat in order.
+# Only handlers that are actually running count against MAX_RUNNING_UPDATES;
+# MAX_PENDING_UPDATES also covers updates waiting for earlier ones of their chat
+MAX_RUNNING_UPDATES = 64
+MAX_PENDING_UPDATES = 100000
+
+# Background sends scheduled while the application is stopping; PTB no longer
+# awaits those, so post_stop waits for them before the bot is shut down
+_late_background_tasks = set()
+
+# Client-side throttling to stay under Telegram's limits: about 30 messages
+# per second overall, about 1 per second within a private chat and about
+# 20 per minute within a group such as the admin chat
+GLOBAL_RATE_LIMIT = 30
+CHAT_RATE_LIMIT = 1
+CHAT_BURST_LIMIT = 3
+ADMIN_CHAT_RATE_LIMIT = 20 / 60
+ADMIN_CHAT_BURST_LIMIT = 20
+# Idle per-chat buckets are pruned once there are more than this many
+MAX_CHAT_BUCKETS = 10000
+
+class TokenBucket:
+    """Token bucket allowing `rate` operations per second with bursts of up to `capacity`."""
+    
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def is_full(self) -> bool:
+        """Return True if the bucket has not been used recently."""
+        self._refill()
+        return self.tokens >= self.capacity
+    
+    async def take(self) -> None:
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+_GLOBAL_BUCKET = TokenBucket(GLOBAL_RATE_LIMIT, GLOBAL_RATE_LIMIT)
+_ADMIN_CHAT_BUCKET = TokenBucket(ADMIN_CHAT_RATE_LIMIT, ADMIN_CHAT_BURST_LIMIT)
+_CHAT_BUCKETS: Dict[int, TokenBucket] = {}
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Update processor that handles different chats concurrently and the updates of one chat in order."""
+    
+    def __init__(self, max_running_updates: int, max_pending_updates: int) -> None:
+        # PTB holds its own semaphore while an update waits for its chat, so that
+        # one only bounds pending updates and running ones are limited separately
+        super().__init__(max_pending_updates)
+        self._max_running_updates = max_running_updates
+        self._running: Optional[asyncio.Semaphore] = None
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_pending: Dict[int, int] = {}
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Wait for the earlier updates of the same chat, then process the update."""
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self._running:
+                await coroutine
+            return
+        
+        lock = self._chat_locks.get(chat.id)
+        if lock is None:
+            lock = self._chat_locks[chat.id] = asyncio.Lock()
+        self._chat_pending[chat.id] = self._chat_pending.get(chat.id, 0) + 1
+        try:
+            async with lock:
+                async with self._running:
+                    await coroutine
+        finally:
+            self._chat_pending[chat.id] -= 1
+            if not self._chat_pending[chat.id]:
+                del self._chat_pending[chat.id]
+                del self._chat_locks[chat.id]
+    
+    async def initialize(self) -> None:
+        """Create the semaphore limiting the running handlers."""
+        self._running = asyncio.Semaphore(self._max_running_updates)
+    
+    async def shutdown(self) -> None:
+        """Nothing to clean up."""
+
 # Helper functions
 def format_user_info(user) -> str:
     """Format user information into a string."""
@@ -44,69 +217,118 @@ def format_user_info(user) -> str:
         info += f" (@{user.username})"
     return info.strip()
 
+def get_cached_user_info(context: ContextTypes.DEFAULT_TYPE, user) -> str:
+    """Return format_user_info(user), reusing the string cached in user_data while the name is unchanged."""
+    key = (user.first_name, user.last_name, user.username)
+    cached = context.user_data.get("_uinfo")
+    if cached and cached[0] == key:
+        return cached[1]
+    
+    info = format_user_info(user)
+    context.user_data["_uinfo"] = (key, info)
+    return info
+
 def extract_ids_from_text(text: str) -> Tuple[Optional[int], Optional[int]]:
     """Extract user ID and message ID from message text."""
     user_id = None
     message_id = None
-    
-    # Try to find user ID in the message
-    id_pattern = r"#ID(\d+)"
-    id_matches = re.findall(id_pattern, text)
-    if id_matches:
-        user_id = int(id_matches[0])
-        logger.info(f"Found user ID in message: {user_id}")
-    else:
-        # Check for user ID in confirmation message format
-        confirmation_pattern = r"Message sent to user #ID(\d+)"
-        conf_matches = re.findall(confirmation_pattern, text)
-        if conf_matches:
-            user_id = int(conf_matches[0])
-            logger.info(f"Found user ID in confirmation message: {user_id}")
-    
-    # Try to find message ID in the message
-    msg_pattern = r"#MSG(\d+)"
-    msg_matches = re.findall(msg_pattern, text)
-    if msg_matches:
-        message_id = int(msg_matches[0])
-        logger.info(f"Found message ID in message: {message_id}")
-    else:
-        # Check for message ID in confirmation message format
-        conf_msg_pattern = r"message #(\d+)"
-        conf_msg_matches = re.findall(conf_msg_pattern, text)
-        if conf_msg_matches:
-            message_id = int(conf_msg_matches[0])
-            logger.info(f"Found message ID in confirmation message: {message_id}")
+    conf_message_id = None
+    
+    # Every tag format contains "#", so text without one can skip the regex
+    if _TAG_MARKER not in text:
+        return user_id, message_id
+    
+    # Single pass over the text; the first user ID tag wins, and a #MSG tag
+    # takes precedence over the confirmation message format
+    for match in _IDS_RE.finditer(text):
+        if user_id is None:
+            if match.group("id"):
+                user_id = int(match.group("id"))
+                logger.info("Found user ID in message: %s", user_id)
+            elif match.group("cid"):
+                user_id = int(match.group("cid"))
+                logger.info("Found user ID in confirmation message: %s", user_id)
+        if message_id is None and match.group("msg"):
+            message_id = int(match.group("msg"))
+            logger.info("Found message ID in message: %s", message_id)
+        elif conf_message_id is None and match.group("cmsg"):
+            conf_message_id = int(match.group("cmsg"))
+        if user_id is not None and message_id is not None:
+            break
+    
+    if message_id is None and conf_message_id is not None:
+        message_id = conf_message_id
+        logger.info("Found message ID in confirmation message: %s", message_id)
     
     return user_id, message_id
 
+def get_attachment_kind(message: Message) -> Optional[str]:
+    """Return the kind of attachment in the message, or None for plain text."""
+    attachment = message.effective_attachment
+    if attachment is None:
+        return None
+    if isinstance(attachment, tuple):
+        return "photo"
+    for attachment_type, kind in _ATTACHMENT_KINDS:
+        if isinstance(attachment, attachment_type):
+            return kind
+    return None
+
 def create_hidden_tag(admin_msg_id: int) -> str:
     """Create a more compact tag with the admin message ID."""
-    return f"\n\n#admsg{admin_msg_id}"
+    return f"\n\n{_ADMSG_MARKER}{admin_msg_id}"
 
 def extract_admin_msg_id(text: str) -> Optional[int]:
     """Extract admin message ID from the tag in message text."""
-    compact_pattern = r"#admsg(\d+)"
-    compact_matches = re.findall(compact_pattern, text)
-    
-    if compact_matches:
-        return int(compact_matches[0])
-    
-    return None
+    # The tag is always appended last by create_hidden_tag, so only the tail
+    # of the text is searched and the ID must run to the end of it
+    start = text.rfind(_ADMSG_MARKER, max(0, len(text) - ADMSG_TAIL_LENGTH))
+    if start < 0:
+        return None
+    
+    start += len(_ADMSG_MARKER)
+    end = start
+    while end < len(text) and text[end].isdecimal():
+        end += 1
+    
+    if end == start or text[end:].strip():
+        return None
+    return int(text[start:end])
+
+def utf16_length(text: str) -> int:
+    """Return the length of the text as Telegram counts it, in UTF-16 code units."""
+    return len(text.encode("utf-16-le")) // 2
+
+def split_utf16(text: str, limit: int) -> Tuple[str, str]:
+    """Split the text so that the first part is at most `limit` UTF-16 code units long."""
+    encoded = text.encode("utf-16-le")
+    if len(encoded) <= 2 * limit:
+        return text, ""
+    
+    cut = 2 * limit
+    # Don't cut between the two halves of a surrogate pair
+    if 0xD8 <= encoded[cut - 1] <= 0xDB:
+        cut -= 2
+    head = encoded[:cut].decode("utf-16-le")
+    return head, text[len(head):]
 
 def get_start_button_keyboard():
-    """Create a keyboard with a Start/Restart button."""
-    keyboard = ReplyKeyboardMarkup(
-        [[KeyboardButton("🔄 Start/Restart")]],
-        resize_keyboard=True
-    )
-    return keyboard
+    """Return the keyboard with a Start/Restart button."""
+    return _START_KEYBOARD
 
 async def send_message(context: ContextTypes.DEFAULT_TYPE, chat_id: Union[str, int], 
                       message: Message, text: Optional[str] = None, 
                       reply_to_message_id: Optional[int] = None,
                       admin_msg_id: Optional[int] = None,
-                      with_restart_button: bool = False) -> Message:
-    """Send a message to a chat based on the message type."""
+                      with_restart_button: bool = False,
+                      attachment_kind: Optional[str] = None,
+                      overflow_header: str = "") -> Message:
+    """Send a message to a chat based on the message type.
+    
+    attachment_kind is the result of get_attachment_kind(message); None sends plain text.
+    overflow_header starts the follow-up message that carries the end of a caption
+    that is too long, so it can hold the tags needed to reply to it.
+    """
     reply_params = {} if reply_to_message_id is None else {"reply_to_message_id": reply_to_message_id}
     
     # Add admin message ID tag if provided - using hidden format
@@ -118,80 +340,96 @@ async def send_message(context: ContextTypes.DEFAULT_TYPE, chat_id: Union[str, i
         reply_params["reply_markup"] = keyboard
     
     try:
-        if message.photo:
+        await wait_for_rate_limit(chat_id)
+        
+        if attachment_kind is not None:
+            method, get_file_id = _MEDIA_DISPATCH[attachment_kind]
             caption = text if text is not None else (message.caption or "")
-            if admin_msg_id is not None:
-                caption += admin_tag
             
-            return await context.bot.send_photo(
-                chat_id=chat_id,
-                photo=message.photo[-1].file_id,
-                caption=caption,
-                **reply_params
-            )
-        elif message.video:
-            caption = text if text is not None else (message.caption or "")
-            if admin_msg_id is not None:
-                caption += admin_tag
-                
-            return await context.bot.send_video(
-                chat_id=chat_id,
-                video=message.video.file_id,
-                caption=caption,
-                **reply_params
-            )
-        elif message.document:
-            caption = text if text is not None else (message.caption or "")
-            if admin_msg_id is not None:
-                caption += admin_tag
-                
-            return await context.bot.send_document(
-                chat_id=chat_id,
-                document=message.document.file_id,
-                caption=caption,
-                **reply_params
-            )
-        elif message.voice:
-            caption = text if text is not None else (message.caption or "")
-            if admin_msg_id is not None:
-                caption += admin_tag
-                
-            return await context.bot.send_voice(
-                chat_id=chat_id,
-                voice=message.voice.file_id,
-                caption=caption,
-                **reply_params
-            )
-        elif message.audio:
-            caption = text if text is not None else (message.caption or "")
-            if admin_msg_id is not None:
-                caption += admin_tag
-                
-            return await context.bot.send_audio(
-                chat_id=chat_id,
-                audio=message.audio.file_id,
-                caption=caption,
-                **reply_params
-            )
-        else:
-            # Plain text message
-            message_text = text if text is not None else (message.text or "")
-            if admin_msg_id is not None:
-                message_text += admin_tag
-                
-            return await context.bot.send_message(
+            # Captions are limited by Telegram, so anything past the limit is sent
+            # separately; the admin tag stays at the end of the caption
+            caption, overflow = split_utf16(caption, MAX_CAPTION_LENGTH - utf16_length(admin_tag))
+            
+            sent_message = await getattr(context.bot, method)(
                 chat_id=chat_id,
-                text=message_text,
+                caption=caption + admin_tag,
+                **{attachment_kind: get_file_id(message)},
                 **reply_params
             )
+            if overflow:
+                # The attachment is already delivered, so a failure here is only logged
+                try:
+                    await send_text(
+                        context.bot,
+                        chat_id=chat_id,
+                        text=overflow_header + overflow + admin_tag,
+                        reply_to_message_id=sent_message.message_id
+                    )
+                except Exception as e:
+                    logger.error("Error sending the rest of a long caption to %s: %s", chat_id, e)
+            return sent_message
+        
+        # Plain text message
+        message_text = text if text is not None else (message.text or "")
+        return await context.bot.send_message(
+            chat_id=chat_id,
+            text=message_text + admin_tag,
+            **reply_params
+        )
     except Exception as e:
-        logger.error(f"Error sending message to {chat_id}: {str(e)}")
+        logger.error("Error sending message to %s: %s", chat_id, e)
         raise
 
+def get_chat_bucket(chat_id: Union[str, int]) -> TokenBucket:
+    """Return the rate limiting bucket of a chat, creating it on first use."""
+    chat_id = int(chat_id)
+    if chat_id == _ADMIN_CHAT_ID_INT:
+        return _ADMIN_CHAT_BUCKET
+    
+    bucket = _CHAT_BUCKETS.get(chat_id)
+    if bucket is None:
+        if len(_CHAT_BUCKETS) >= MAX_CHAT_BUCKETS:
+            for idle_chat_id in [cid for cid, b in _CHAT_BUCKETS.items() if b.is_full()]:
+                del _CHAT_BUCKETS[idle_chat_id]
+        bucket = _CHAT_BUCKETS[chat_id] = TokenBucket(CHAT_RATE_LIMIT, CHAT_BURST_LIMIT)
+    return bucket
+
+async def wait_for_rate_limit(chat_id: Union[str, int]) -> None:
+    """Wait until a message may be sent to the chat without exceeding Telegram's limits."""
+    # The chat's own limit is usually the tighter one, so wait for it before
+    # taking a bot-wide token
+    await get_chat_bucket(chat_id).take()
+    await _GLOBAL_BUCKET.take()
+
+async def send_text(bot, chat_id: Union[str, int], text: str, **kwargs) -> Message:
+    """Send a plain text message once the rate limits allow it."""
+    await wait_for_rate_limit(chat_id)
+    return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+
+def create_background_task(context: ContextTypes.DEFAULT_TYPE, coroutine) -> asyncio.Task:
+    """Run a non-critical send in the background without delaying the handler."""
+    if context.application.running:
+        return context.application.create_task(coroutine)
+    
+    # Updates still queued on shutdown are handled after the application stopped running
+    task = asyncio.create_task(coroutine)
+    _late_background_tasks.add(task)
+    task.add_done_callback(_late_background_tasks.discard)
+    return task
+
+async def send_typing_action(context: ContextTypes.DEFAULT_TYPE, chat_id: Union[str, int]) -> None:
+    """Show the typing indicator in a chat; it is best-effort, so errors are only logged."""
+    # Chat actions are not messages, so they do not take a rate limit token
+    try:
+        await context.bot.send_chat_action(chat_id=chat_id, action="typing")
+    except Exception as e:
+        logger.warning("Error sending typing action to %s: %s", chat_id, e)
+
 # Command handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send welcome message when the command /start is issued."""
     keyboard = get_start_button_keyboard()
+    await wait_for_rate_limit(update.effective_chat.id)
     await update.message.reply_text(
         WELCOME_MESSAGE,
         reply_markup=keyboard
@@ -215,10 +453,11 @@ async def handle_user_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     user_id = user.id
     message = update.message
     message_id = message.message_id
-    date_time = update.message.date.strftime('%Y-%m-%d %H:%M:%S')
+    # PTB dates are timezone-aware UTC; drop the tzinfo so no "+00:00" suffix is added
+    date_time = message.date.replace(tzinfo=None).isoformat(sep=' ', timespec='seconds')
     
     # Log the incoming message
-    logger.info(f"Received message from user {user_id}: {message.text or '[attachment]'}")
+    logger.info("Received message from user %s: %s", user_id, message.text or "[attachment]")
     
     # Check if this is a reply to an admin message by looking for the admin message tag
     admin_reply_id = None
@@ -226,60 +465,55 @@ async def handle_user_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         reply_text = message.reply_to_message.text or message.reply_to_message.caption or ""
         admin_msg_id = extract_admin_msg_id(reply_text)
         if admin_msg_id is not None:
-            logger.info(f"User is replying to admin message ID: {admin_msg_id}")
+            logger.info("User is replying to admin message ID: %s", admin_msg_id)
             admin_reply_id = admin_msg_id
     
     # Format message for admin
-    admin_text = f"[{date_time}]\n"
-    admin_text += f"From: {format_user_info(user)} #ID{user_id}\n"
-    admin_text += f"#MSG{message_id}\n"  # This is the important part for replies
+    header = (
+        f"[{date_time}]\n"
+        f"From: {get_cached_user_info(context, user)} #ID{user_id}\n"
+        f"#MSG{message_id}\n"  # This is the important part for replies
+    )
+    parts = [header]
     
     # If this is a reply to an admin's message, note it
     if message.reply_to_message:
         if admin_reply_id:
-            admin_text += f"↩️ Reply to admin message #{admin_reply_id}\n"
+            parts.append(f"↩️ Reply to admin message #{admin_reply_id}\n")
         else:
-            admin_text += f"↩️ Reply to message #{message.reply_to_message.message_id}\n"
+            parts.append(f"↩️ Reply to message #{message.reply_to_message.message_id}\n")
     
     # Add message content
     if message.text:
-        admin_text += f"Message: {message.text}\n"
+        parts.append(f"Message: {message.text}\n")
     
     # Check if there are attachments
-    has_attachment = bool(message.photo or message.video or message.document or message.voice or message.audio)
-    if has_attachment:
-        admin_text += "Attachments: "
-        if message.photo:
-            admin_text += "[Photo]"
-        elif message.video:
-            admin_text += "[Video]"
-        elif message.document:
-            admin_text += f"[File: {message.document.file_name}]"
-        elif message.voice:
-            admin_text += "[Voice message]"
-        elif message.audio:
-            admin_text += f"[Audio: {message.audio.title or 'Unknown title'}]"
+    attachment_kind = get_attachment_kind(message)
+    if attachment_kind:
+        parts.append("Attachments: ")
+        parts.append(_ATTACHMENT_LABELS[attachment_kind](message))
         
         if message.caption:
-            admin_text += f" with caption: {message.caption}"
+            parts.append(f" with caption: {message.caption}")
     
-    try:
-        # Forward message to admin - set up reply if we found a admin message ID
-        reply_params = {}
-        if admin_reply_id:
-            reply_params = {"reply_to_message_id": admin_reply_id}
-            
-        sent_msg = await send_message(context, ADMIN_CHAT_ID, message, admin_text, **reply_params)
-        logger.info(f"Sent message to admin, ID: {sent_msg.message_id}")
-        
-        # Send confirmation message to user with restart button
-        await context.bot.send_message(
-            chat_id=user_id,
-            text=CONFIRMATION_MESSAGE,
-            reply_markup=get_start_button_keyboard()
-        )
-    except Exception as e:
-        logger.error(f"Error processing user message: {e}")
+    admin_text = "".join(parts)
+    
+    # Forward message to admin - set up reply if we found a admin message ID
+    reply_params = {}
+    if admin_reply_id:
+        reply_params = {"reply_to_message_id": admin_reply_id}
+    
+    if BATCH_FLUSH_INTERVAL > 0 and attachment_kind is None and not reply_params:
+        # Plain text forwards are coalesced per user
+        queue_admin_forward(context, user_id, admin_text)
+        send_confirmation(context, user_id)
+    else:
+        # Pending text forwards of this user go out first to keep the order
+        if BATCH_FLUSH_INTERVAL > 0:
+            flush_admin_batch(context, user_id)
+        chain_admin_forward(context, user_id, forward_to_admin(
+            context, user_id, message, admin_text, header, attachment_kind, reply_params
+        ))
 
 async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle messages from the admin."""
@@ -288,27 +522,30 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
     
     message = update.message
     admin_msg_id = message.message_id  # Store this to include in the message to user
-    logger.info(f"Processing admin reply: {message.text or '[attachment]'}")
+    logger.info("Processing admin reply: %s", message.text or "[attachment]")
     
     # Get the text content of the message being replied to
     reply_text = message.reply_to_message.text or message.reply_to_message.caption or ""
-    logger.info(f"Admin replying to: {reply_text}")
+    logger.info("Admin replying to: %s", reply_text)
     
     # Extract user ID and original message ID from the reply text
     user_id, original_message_id = extract_ids_from_text(reply_text)
-    logger.info(f"Extracted user_id: {user_id}, original_message_id: {original_message_id}")
+    logger.info("Extracted user_id: %s, original_message_id: %s", user_id, original_message_id)
     
     if not user_id:
         logger.error("No user ID found in message!")
-        await context.bot.send_message(
-            chat_id=ADMIN_CHAT_ID,
-            text="⚠️ Could not find the user ID in the message. Make sure you're replying to a forwarded user message."
+        create_background_task(context,
+            send_text(
+                context.bot,
+                chat_id=ADMIN_CHAT_ID,
+                text="⚠️ Could not find the user ID in the message. Make sure you're replying to a forwarded user message."
+            )
         )
         return
     
     try:
-        # Let the user know the admin is typing
-        await context.bot.send_chat_action(chat_id=user_id, action="typing")
+        # Let the user know the admin is typing, without delaying the reply itself
+        create_background_task(context, send_typing_action(context, user_id))
         
         # Send the admin's message to the user as a reply to their original message
         # Include the admin message ID in the message for tracking replies
@@ -318,23 +555,30 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
             message, 
             reply_to_message_id=original_message_id,
             admin_msg_id=admin_msg_id,  # This is the key addition
-            with_restart_button=True     # Add the restart button to admin replies
+            with_restart_button=True,    # Add the restart button to admin replies
+            attachment_kind=get_attachment_kind(message)
         )
-        logger.info(f"Sent admin's reply to user {user_id}, message ID: {sent_message.message_id}")
+        logger.info("Sent admin's reply to user %s, message ID: %s", user_id, sent_message.message_id)
         
         # Confirm to admin that the message was sent - as a reply to the admin's message
         confirmation_message = f"✅ Message sent to user #ID{user_id} (message #{admin_msg_id})"
-        await context.bot.send_message(
-            chat_id=ADMIN_CHAT_ID,
-            text=confirmation_message,
-            reply_to_message_id=admin_msg_id  # Send as reply to admin's original message
+        create_background_task(context,
+            send_text(
+                context.bot,
+                chat_id=ADMIN_CHAT_ID,
+                text=confirmation_message,
+                reply_to_message_id=admin_msg_id  # Send as reply to admin's original message
+            )
         )
     except Exception as e:
+        logger.error("Error sending message to user %s: %s", user_id, e)
         error_msg = f"⚠️ Error sending message to user: {str(e)}"
-        logger.error(error_msg)
-        await context.bot.send_message(
-            chat_id=ADMIN_CHAT_ID,
-            text=error_msg
+        create_background_task(context,
+            send_text(
+                context.bot,
+                chat_id=ADMIN_CHAT_ID,
+                text=error_msg
+            )
         )
 
 async def message_router(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -351,23 +595,143 @@ async def message_router(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     # Log basic information about the message
-    logger.info(f"Message from chat ID: {chat_id}")
-    logger.info(f"Is reply: {bool(message.reply_to_message)}")
-    logger.info(f"Text: {message.text or message.caption or '[no text]'}")
-    
-    if message.reply_to_message:
-        logger.info(f"Reply to message ID: {message.reply_to_message.message_id}")
+    reply_to_id = message.reply_to_message.message_id if message.reply_to_message else None
+    logger.info(
+        "Message from chat ID: %s, is reply: %s, reply to message ID: %s, text: %s",
+        chat_id, reply_to_id is not None, reply_to_id, message.text or message.caption or "[no text]"
+    )
     
     # Route message to appropriate handler
-    if str(chat_id) == ADMIN_CHAT_ID and message.reply_to_message:
+    is_admin = chat_id == _ADMIN_CHAT_ID_INT
+    if is_admin and message.reply_to_message:
         await handle_admin_message(update, context)
-    elif str(chat_id) != ADMIN_CHAT_ID:
+    elif not is_admin:
         await handle_user_message(update, context)
 
+def send_confirmation(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> None:
+    """Send the confirmation message with the restart button to the user in the background."""
+    create_background_task(context,
+        send_text(
+            context.bot,
+            chat_id=user_id,
+            text=CONFIRMATION_MESSAGE,
+            reply_markup=get_start_button_keyboard()
+        )
+    )
+
+async def run_after(previous: Optional[asyncio.Task], coroutine) -> None:
+    """Await the coroutine once the previous task has finished."""
+    if previous is not None:
+        await asyncio.wait([previous])
+    await coroutine
+
+def chain_admin_forward(context: ContextTypes.DEFAULT_TYPE, user_id: int, coroutine) -> None:
+    """Run a send to the admin chat in the background after the user's earlier ones."""
+    task = create_background_task(context, run_after(_admin_forward_chains.get(user_id), coroutine))
+    _admin_forward_chains[user_id] = task
+    
+    def forget(done: asyncio.Task) -> None:
+        if _admin_forward_chains.get(user_id) is done:
+            del _admin_forward_chains[user_id]
+    
+    task.add_done_callback(forget)
+
+async def forward_to_admin(context: ContextTypes.DEFAULT_TYPE, user_id: int, message: Message,
+                           admin_text: str, header: str, attachment_kind: Optional[str],
+                           reply_params: dict) -> None:
+    """Forward a user message to the admin and confirm it to the user once it is sent."""
+    try:
+        sent_msg = await send_message(context, ADMIN_CHAT_ID, message, admin_text,
+                                      attachment_kind=attachment_kind, overflow_header=header,
+                                      **reply_params)
+        logger.info("Sent message to admin, ID: %s", sent_msg.message_id)
+    except Exception as e:
+        logger.error("Error processing user message: %s", e)
+        return
+    
+    send_confirmation(context, user_id)
+
+def take_admin_batch(user_id: int) -> Optional[List[str]]:
+    """Remove and return the user's pending text forwards, cancelling their flush timer."""
+    timer = _admin_batch_timers.pop(user_id, None)
+    if timer is not None:
+        timer.cancel()
+    return _admin_batches.pop(user_id, None)
+
+async def send_admin_batch(bot, user_id: int, texts: List[str]) -> None:
+    """Send text forwards of a user to the admin, joined into as few messages as possible."""
+    # Only forwards from the same user share a message, so the first #ID and
+    # #MSG tags in it still point admin replies at the right conversation
+    chunks = []
+    for admin_text in texts:
+        if chunks and len(chunks[-1]) + len(BATCH_SEPARATOR) + len(admin_text) <= MAX_MESSAGE_LENGTH:
+            chunks[-1] += BATCH_SEPARATOR + admin_text
+        else:
+            chunks.append(admin_text)
+    
+    for chunk in chunks:
+        try:
+            sent_msg = await send_text(bot, ADMIN_CHAT_ID, chunk)
+            logger.info("Sent batched messages from user %s to admin, ID: %s", user_id, sent_msg.message_id)
+        except Exception as e:
+            logger.error("Error sending batched messages from user %s to admin: %s", user_id, e)
+
+def flush_admin_batch(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> None:
+    """Queue the user's pending text forwards on their chain of sends to the admin."""
+    texts = take_admin_batch(user_id)
+    if texts:
+        chain_admin_forward(context, user_id, send_admin_batch(context.bot, user_id, texts))
+
+async def flush_admin_batch_later(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> None:
+    """Flush the user's batch once BATCH_FLUSH_INTERVAL has passed."""
+    await asyncio.sleep(BATCH_FLUSH_INTERVAL)
+    # Forget this timer first so flushing does not cancel the running task
+    del _admin_batch_timers[user_id]
+    flush_admin_batch(context, user_id)
+
+def queue_admin_forward(context: ContextTypes.DEFAULT_TYPE, user_id: int, admin_text: str) -> None:
+    """Add a text forward to the user's batch, flushing it early once it reaches MAX_BUFFER_CHARS."""
+    texts = _admin_batches.setdefault(user_id, [])
+    texts.append(admin_text)
+    if sum(len(text) for text in texts) >= MAX_BUFFER_CHARS:
+        flush_admin_batch(context, user_id)
+    elif user_id not in _admin_batch_timers:
+        _admin_batch_timers[user_id] = asyncio.create_task(flush_admin_batch_later(context, user_id))
+
+async def post_stop(application: Application) -> None:
+    """Wait for late background sends, then flush the pending batched forwards."""
+    # Late tasks can schedule further ones, e.g. a confirmation after a forward
+    while _late_background_tasks:
+        results = await asyncio.gather(*_late_background_tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Error in background task during shutdown: %s", result)
+    
+    for user_id in list(_admin_batches):
+        await send_admin_batch(application.bot, user_id, take_admin_batch(user_id))
+
 def main() -> None:
     """Start the bot."""
+    # Bot API calls from concurrently processed chats share one large connection pool;
+    # fetching updates only ever needs a few connections
+    request = HTTPXRequest(
+        connection_pool_size=256,
+        pool_timeout=10,
+        connect_timeout=5,
+        read_timeout=20
+    )
+    get_updates_request = HTTPXRequest(connection_pool_size=8)
+    
     # Create the application and pass it the token
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(request)
+        .get_updates_request(get_updates_request)
+        .concurrent_updates(PerChatUpdateProcessor(MAX_RUNNING_UPDATES, MAX_PENDING_UPDATES))
+        .post_stop(post_stop)
+        .build()
+    )
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
@@ -384,7 +748,17 @@ def main() -> None:
     logger.info("Support Bot started!")
     
     # Start the Bot
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if USE_WEBHOOK:
+        # The token is used as the URL path so only Telegram knows where to post updates
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=PORT,
+            url_path=TELEGRAM_BOT_TOKEN,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{TELEGRAM_BOT_TOKEN}",
+            allowed_updates=Update.ALL_TYPES
+        )
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == '__main__':
     main()